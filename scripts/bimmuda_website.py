@@ -7,14 +7,26 @@ A decade-based website showcasing 381 unique songs with rich metadata
 from flask import Flask, render_template_string, request, jsonify
 import sqlite3
 import os
-from collections import Counter, defaultdict
+import re
+import threading
 
 app = Flask(__name__)
 
 # Database path
-import os
 BIMMUDA_DB = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'databases', 'billboard_data.db')
 
+# Apostrophe variants different devices/keyboards produce (curly quotes,
+# backtick, prime, acute accent, Greek breathing marks), normalized to '
+APOSTROPHE_RE = re.compile('[\u2018\u2019`\u2032\u00b4\u1ffe\u1fff]')
+
+# Decade spellings accepted by the year search: written out, or 2/4 digits
+# followed by "s" or "'s"
+DECADE_QUERY_RE = re.compile(r"(?P<word>fifties|sixties|seventies|eighties|nineties)|(?P<digits>\d{2}|\d{4})'?s")
+DECADE_WORDS = {
+    'fifties': 1950, 'sixties': 1960, 'seventies': 1970, 
+    'eighties': 1980, 'nineties': 1990
+}
+
 class TablatureGenerator:
     """Simplified tablature generator for website integration"""
     
@@ -167,11 +179,26 @@ class TablatureGenerator:
 # Create tablature generator instance
 tab_generator = TablatureGenerator()
 
+# Connection shared by all request threads, opened on first use. The site
+# only reads through it, but it is opened read-write: journal_mode=WAL is
+# stored in the database file itself, and WAL readers need write access to
+# the data directory for the -wal/-shm files.
+_db_conn = None
+_db_conn_lock = threading.Lock()
+
 def get_db_connection():
-    """Get database connection to BiMMuDa data"""
-    conn = sqlite3.connect(BIMMUDA_DB)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get the shared database connection to BiMMuDa data (never close it)"""
+    global _db_conn
+    if _db_conn is None:
+        with _db_conn_lock:
+            if _db_conn is None:
+                conn = sqlite3.connect(BIMMUDA_DB, check_same_thread=False, isolation_level=None)
+                conn.row_factory = sqlite3.Row
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA cache_size=-20000")
+                conn.execute("PRAGMA mmap_size=268435456")
+                _db_conn = conn
+    return _db_conn
 
 def get_lyrics_data(folder_path):
     """Load lyrics from BiMMuDa dataset"""
@@ -191,41 +218,54 @@ def get_lyrics_data(folder_path):
         bimmuda_base = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'bimmuda')
         lyrics_path = os.path.join(bimmuda_base, folder_path, lyrics_filename)
         
-        if os.path.exists(lyrics_path):
-            with open(lyrics_path, 'r', encoding='utf-8') as f:
-                lyrics_content = f.read().strip()
-                return lyrics_content
+        # Open directly; a missing lyrics file just means there are none to show
+        with open(lyrics_path, 'r', encoding='utf-8') as f:
+            lyrics_content = f.read().strip()
+            return lyrics_content
         
+    except FileNotFoundError:
+        pass
     except Exception as e:
         print(f"Error loading lyrics: {e}")
     
     return None
 
+# Decade summary is computed once; song years never change while the site runs
+_decade_summary = None
+
+def get_decade_summary():
+    """Get per-decade song counts, cached after the first query"""
+    global _decade_summary
+    if _decade_summary is None:
+        conn = get_db_connection()
+        
+        decades_query = """
+            SELECT 
+                (year/10)*10 as decade,
+                COUNT(*) as song_count,
+                MIN(year) as start_year,
+                MAX(year) as end_year
+            FROM bimmuda_songs 
+            GROUP BY decade 
+            ORDER BY decade
+        """
+        
+        _decade_summary = [dict(row) for row in conn.execute(decades_query).fetchall()]
+    
+    return _decade_summary
+
 @app.route('/')
 def home():
     """Main page with decade selection"""
-    conn = get_db_connection()
-    
-    # Get decade summary
-    decades_query = """
-        SELECT 
-            (year/10)*10 as decade,
-            COUNT(*) as song_count,
-            MIN(year) as start_year,
-            MAX(year) as end_year
-        FROM bimmuda_songs 
-        GROUP BY decade 
-        ORDER BY decade
-    """
-    
-    decades = conn.execute(decades_query).fetchall()
-    conn.close()
-    
-    return render_template_string(HOME_TEMPLATE, decades=decades)
+    return render_template_string(HOME_TEMPLATE, decades=get_decade_summary())
 
 @app.route('/decade/<int:decade>')
 def decade_view(decade):
     """Show songs for a specific decade"""
+    # Only serve decades that actually have songs
+    if decade not in {row['decade'] for row in get_decade_summary()}:
+        return "Decade not found", 404
+    
     conn = get_db_connection()
     
     # Get songs for this decade with rich metadata and chord progressions
@@ -248,30 +288,22 @@ def decade_view(decade):
     
     songs = conn.execute(songs_query, (decade, decade + 10)).fetchall()
     
-    # Count songs with chords
-    songs_with_chords = []
-    chord_count = 0
-    for song in songs:
-        song_dict = dict(song)
-        if song_dict['chord_progression']:
-            chord_count += 1
-        songs_with_chords.append(song_dict)
+    songs_with_chords = [dict(song) for song in songs]
     
-    # Get decade stats
+    # Get decade stats, including how many songs have chords
     stats_query = """
         SELECT 
             COUNT(*) as total_songs,
             COUNT(CASE WHEN has_midi_files = 1 THEN 1 END) as midi_count,
             COUNT(CASE WHEN has_lyrics = 1 THEN 1 END) as lyrics_count,
-            COUNT(CASE WHEN audio_link != 'N/A' THEN 1 END) as audio_count
+            COUNT(CASE WHEN audio_link != 'N/A' THEN 1 END) as audio_count,
+            COUNT(NULLIF(chord_progression, '')) as chord_count
         FROM bimmuda_songs 
         WHERE year >= ? AND year < ?
     """
     
     stats = conn.execute(stats_query, (decade, decade + 10)).fetchone()
     stats_dict = dict(stats)
-    stats_dict['chord_count'] = chord_count
-    conn.close()
     
     return render_template_string(
         DECADE_TEMPLATE, 
@@ -290,7 +322,6 @@ def song_detail(song_id):
     """
     
     song = conn.execute(song_query, (song_id,)).fetchone()
-    conn.close()
     
     if not song:
         return "Song not found", 404
@@ -352,77 +383,36 @@ def search():
         
         # Handle various decade formats - normalize ALL types of apostrophes
         # Different devices/keyboards produce different apostrophe characters
-        apostrophes = [''', ''', '`', '′', '´', '῾', '῿', "'"]  # All possible apostrophes
-        for apostrophe in apostrophes:
-            query_lower = query_lower.replace(apostrophe, "'")
-        
-        decade_found = False
+        query_lower = APOSTROPHE_RE.sub("'", query_lower)
+        
+        # Recognize "sixties", "1970s", "70s", "1970's" and "70's" in one match
+        decade = None
+        decade_match = DECADE_QUERY_RE.fullmatch(query_lower)
+        if decade_match and decade_match.group('word'):
+            decade = DECADE_WORDS[decade_match.group('word')]
+        elif decade_match:
+            base_year = decade_match.group('digits')
+            if len(base_year) == 2:  # "70s" -> 1970s
+                base_num = int(base_year)
+                # Handle century logic: 50-99 = 1900s, 00-49 = 2000s
+                if base_num >= 50:
+                    decade = 1900 + base_num
+                else:
+                    decade = 2000 + base_num
+            else:  # "1970s"
+                decade = int(base_year)
+            
+            if not 1950 <= decade <= 2020:  # Reasonable range check
+                decade = None
         
-        # Check for written decades first: "sixties", "seventies", etc.
-        if query_lower in ['fifties', 'sixties', 'seventies', 'eighties', 'nineties']:
-            decade_map = {
-                'fifties': 1950, 'sixties': 1960, 'seventies': 1970, 
-                'eighties': 1980, 'nineties': 1990
-            }
-            decade = decade_map[query_lower]
+        decade_found = decade is not None
+        if decade_found:
             search_query = """
                 SELECT * FROM bimmuda_songs 
                 WHERE year >= ? AND year < ?
                 ORDER BY year, title
             """
             results = conn.execute(search_query, (decade, decade + 10)).fetchall()
-            decade_found = True
-        
-        # Check for decades with apostrophe: "1970's", "70's"  
-        elif query_lower.endswith("'s"):
-            base_year = query_lower[:-2]  # Remove 's from end
-            if base_year.isdigit():
-                if len(base_year) == 2:  # "70's" -> 1970s
-                    base_num = int(base_year)
-                    # Handle century logic: 50-99 = 1900s, 00-49 = 2000s
-                    if base_num >= 50:
-                        decade = 1900 + base_num
-                    else:
-                        decade = 2000 + base_num
-                elif len(base_year) == 4:  # "1970's"
-                    decade = int(base_year)
-                else:
-                    decade = None
-                
-                if decade and decade >= 1950 and decade <= 2020:  # Reasonable range check
-                    search_query = """
-                        SELECT * FROM bimmuda_songs 
-                        WHERE year >= ? AND year < ?
-                        ORDER BY year, title
-                    """
-                    results = conn.execute(search_query, (decade, decade + 10)).fetchall()
-                    decade_found = True
-        
-        # Check for decades ending in 's': "1970s", "70s"  
-        elif query_lower.endswith('s'):
-            base_year = query_lower[:-1]  # Remove 's from end
-            if base_year.isdigit():
-                if len(base_year) == 2:  # "70s" -> 1970s
-                    base_num = int(base_year)
-                    # Handle century logic: 50-99 = 1900s, 00-49 = 2000s
-                    if base_num >= 50:
-                        decade = 1900 + base_num
-                    else:
-                        decade = 2000 + base_num
-                elif len(base_year) == 4:  # "1970s"
-                    decade = int(base_year)
-                else:
-                    decade = None
-                
-                if decade and decade >= 1950 and decade <= 2020:  # Reasonable range check
-                    search_query = """
-                        SELECT * FROM bimmuda_songs 
-                        WHERE year >= ? AND year < ?
-                        ORDER BY year, title
-                    """
-                    results = conn.execute(search_query, (decade, decade + 10)).fetchall()
-                    decade_found = True
-        
         
         # If no decade found, try exact year match
         if not decade_found:
@@ -445,8 +435,6 @@ def search():
         """
         results = conn.execute(search_query, (f'%{query}%', f'%{query}%', f'%{query}%')).fetchall()
     
-    conn.close()
-    
     # Convert to list of dicts for template
     search_results = [dict(row) for row in results]
     
@@ -567,9 +555,6 @@ def get_suggestions():
         print(f"Error getting suggestions: {e}")
         suggestions = []
     
-    finally:
-        conn.close()
-    
     return jsonify({'suggestions': suggestions[:10]})  # Limit to 10 suggestions
 
 
@@ -5,7 +5,6 @@ Check website functionality and chord diagram integration
 
 import requests
 import sqlite3
-from urllib.parse import quote
 
 def test_website_endpoints():
     """Test key website endpoints"""
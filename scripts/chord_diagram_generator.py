@@ -6,7 +6,6 @@ Creates chord diagrams for our extracted chord progressions
 
 import sqlite3
 import json
-from collections import defaultdict
 
 class ChordDiagramGenerator:
     def __init__(self, db_path='../data/databases/billboard_data.db'):
@@ -15,17 +15,14 @@ def implementation_summary():
     db_path = "../data/databases/billboard_data.db"
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
+    cursor.execute("PRAGMA query_only=ON")  # Read-only report
     
-    # Count total songs and songs with chords
-    cursor.execute("SELECT COUNT(*) FROM bimmuda_songs")
-    total_songs = cursor.fetchone()[0]
-    
+    # Count total songs and songs with chords in one scan
     cursor.execute("""
-        SELECT COUNT(*) FROM bimmuda_songs 
-        WHERE chord_progression IS NOT NULL 
-        AND chord_progression != ''
+        SELECT COUNT(*), COUNT(NULLIF(chord_progression, ''))
+        FROM bimmuda_songs
     """)
-    songs_with_chords = cursor.fetchone()[0]
+    total_songs, songs_with_chords = cursor.fetchone()
     
     # Count unique chords
     cursor.execute("""
@@ -34,10 +31,10 @@ def implementation_summary():
         AND chord_progression != ''
     """)
     
+    # Stream rows from the cursor rather than materializing them all
     all_chords = set()
-    for (progression,) in cursor.fetchall():
-        chords = [c.strip() for c in progression.split(' - ')]
-        all_chords.update(chords)
+    for (progression,) in cursor:
+        all_chords.update(c.strip() for c in progression.split(' - '))
     
     conn.close()
     
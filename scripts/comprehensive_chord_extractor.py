@@ -5,14 +5,35 @@ Extracts chord progressions from all BiMMuDa MIDI files and McGill annotations
 """
 
 import os
+import re
+import sys
 import sqlite3
 import pretty_midi
-from collections import Counter, defaultdict
-import glob
+
+# BiMMuDa MIDI filenames start with year and chart position: YYYY_PP_full.mid
+MIDI_FILENAME_RE = re.compile(r'(\d{4})_(\d+)(?:_|\.mid$)')
+
+# Version of the MIDI chord extraction rules (chord_patterns, window rules,
+# pitches_to_chord_name); bump it when they change so cached results are redone
+CHORD_CACHE_VERSION = 1
+
+# Songs in the source_midis folder that don't follow the YYYY_PP naming
+SOURCE_MIDI_SONGS = {
+    "All-Shook-Up-1.mid": ("All Shook Up", "Elvis Presley"),
+    "AllIHaveToDoIsDream.mid": ("All I Have to Do Is Dream", "The Everly Brothers"),
+    "California-Dreaming.mid": ("California Dreamin'", "The Mamas & The Papas"),
+    "HeyJude.mid": ("Hey Jude", "The Beatles"),
+    "I-Get-Around-1.mid": ("I Get Around", "The Beach Boys"),
+    "JoyToTheWorld.mid": ("Joy to the World", "Three Dog Night"),
+    "Paula Abdul - Straight Up L.mid": ("Straight Up", "Paula Abdul")
+}
 
 class ChordExtractor:
-    def __init__(self, db_path='../data/databases/billboard_data.db'):
+    def __init__(self, db_path='../data/databases/billboard_data.db',
+                 cache_path='../data/databases/midi_chord_cache.db'):
         self.db_path = db_path
+        self.cache_path = cache_path  # Kept apart from the database the website serves
+        self._song_lookup = None  # Filled on first use, see load_song_lookup()
         self.note_names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
         
         # Enhanced chord patterns including 7ths, sus, and more complex chords
@@ -77,10 +98,17 @@ class ChordExtractor:
                         window_notes.append(note.pitch % 12)
                 
                 if len(window_notes) >= 3:  # Need at least 3 notes for a meaningful chord
-                    # Find most common pitch classes in this window
-                    pitch_counts = Counter(window_notes)
-                    # Take the most common pitches, up to 6
-                    chord_pitches = [pitch for pitch, count in pitch_counts.most_common(6)]
+                    # Count pitch classes in a 12-slot list, remembering the
+                    # order they first appear so ties rank as they would
+                    # with Counter.most_common
+                    pitch_counts = [0] * 12
+                    first_seen = []
+                    for pitch in window_notes:
+                        if not pitch_counts[pitch]:
+                            first_seen.append(pitch)
+                        pitch_counts[pitch] += 1
+                    # Take the most common pitches, up to 6 (sort is stable)
+                    chord_pitches = sorted(first_seen, key=pitch_counts.__getitem__, reverse=True)[:6]
                     
                     if chord_pitches:
                         chord_name = self.pitches_to_chord_name(chord_pitches)
@@ -89,13 +117,8 @@ class ChordExtractor:
                 
                 current_time += window_size
             
-            # Return up to 8 unique chords
-            unique_chords = []
-            for chord in chords:
-                if chord not in unique_chords:
-                    unique_chords.append(chord)
-                if len(unique_chords) >= 8:
-                    break
+            # Return up to 8 unique chords (dict keeps first-seen order)
+            unique_chords = list(dict.fromkeys(chords))[:8]
             
             return " - ".join(unique_chords) if unique_chords else None
             
@@ -123,40 +146,92 @@ class ChordExtractor:
         midi_files = []
         base_path = "../data/bimmuda/BiMMuDa-main"
         
-        # Check bimmuda_dataset folders (year/position/midi files)
+        # Check bimmuda_dataset folders (year/position/midi files). scandir
+        # entries carry their file type, so no extra stat per entry is needed.
         dataset_path = os.path.join(base_path, "bimmuda_dataset")
         if os.path.exists(dataset_path):
-            for year_folder in os.listdir(dataset_path):
-                year_path = os.path.join(dataset_path, year_folder)
-                if os.path.isdir(year_path) and year_folder.isdigit():
-                    # Each year has position folders
-                    for position_folder in os.listdir(year_path):
-                        position_path = os.path.join(year_path, position_folder)
-                        if os.path.isdir(position_path):
-                            # Look for _full.mid files (complete song arrangements)
-                            for file in os.listdir(position_path):
-                                if file.endswith('_full.mid'):
-                                    midi_files.append(os.path.join(position_path, file))
+            with os.scandir(dataset_path) as year_entries:
+                for year_entry in year_entries:
+                    if year_entry.name.isdigit() and year_entry.is_dir():
+                        # Each year has position folders
+                        with os.scandir(year_entry.path) as position_entries:
+                            for position_entry in position_entries:
+                                if position_entry.is_dir():
+                                    # Look for _full.mid files (complete song arrangements)
+                                    with os.scandir(position_entry.path) as file_entries:
+                                        midi_files.extend(entry.path for entry in file_entries
+                                                          if entry.name.endswith('_full.mid'))
         
         # Check source_midis folder
         source_midis_path = os.path.join(base_path, "source_midis")
         if os.path.exists(source_midis_path):
-            for file in os.listdir(source_midis_path):
-                if file.endswith('.mid'):
-                    midi_files.append(os.path.join(source_midis_path, file))
+            with os.scandir(source_midis_path) as file_entries:
+                midi_files.extend(entry.path for entry in file_entries if entry.name.endswith('.mid'))
         
         print(f"Found {len(midi_files)} MIDI files")
         return midi_files
 
+    def load_song_lookup(self):
+        """Load bimmuda_songs once as (year, position) and (title, artist) lookup dicts"""
+        if self._song_lookup is None:
+            by_position = {}
+            by_title = {}
+            
+            conn = sqlite3.connect(self.db_path)
+            for row in conn.execute("""
+                SELECT id, title, artist, year, position,
+                       CAST(year AS INTEGER), CAST(position AS INTEGER)
+                FROM bimmuda_songs 
+                ORDER BY rowid
+            """):
+                song = row[:5]
+                by_position.setdefault((row[5], row[6]), song)
+                by_title.setdefault((row[1], row[2]), song)
+            conn.close()
+            
+            self._song_lookup = (by_position, by_title)
+        
+        return self._song_lookup
+
+    def load_chord_cache(self):
+        """Load cached (mtime, size, chords) MIDI extractions for CHORD_CACHE_VERSION"""
+        conn = sqlite3.connect(self.cache_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS midi_chord_cache (
+                filepath TEXT PRIMARY KEY,
+                mtime REAL,
+                size INTEGER,
+                version INTEGER,
+                chords TEXT
+            )
+        """)
+        cache = {filepath: (mtime, size, chords) for filepath, mtime, size, chords in conn.execute("""
+            SELECT filepath, mtime, size, chords FROM midi_chord_cache
+            WHERE version = ? AND chords IS NOT NULL
+        """, (CHORD_CACHE_VERSION,))}
+        conn.close()
+        return cache
+
+    def save_chord_cache(self, entries):
+        """Store (filepath, mtime, size, chords) rows in the chord cache"""
+        if not entries:
+            return
+        
+        conn = sqlite3.connect(self.cache_path)
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO midi_chord_cache VALUES (?, ?, ?, ?, ?)",
+                             ((filepath, mtime, size, CHORD_CACHE_VERSION, chords)
+                              for filepath, mtime, size, chords in entries))
+        conn.close()
+
     def match_midi_to_songs(self, midi_path):
         """Match MIDI file to database songs using the BiMMuDa folder structure"""
         # Extract info from MIDI path
         filename = os.path.basename(midi_path)
         folder_path = os.path.dirname(midi_path)
         
-        # Query database for potential matches
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Songs are looked up in memory instead of one query per file
+        songs_by_position, songs_by_title = self.load_song_lookup()
         
         # Try to match based on BiMMuDa folder structure: year/position/YYYY_PP_full.mid
         if 'bimmuda_dataset' in folder_path:
@@ -177,58 +252,28 @@ class ChordExtractor:
                 
                 # Also try to extract from filename: YYYY_PP_full.mid
                 if not (year_match and position_match):
-                    filename_parts = filename.replace('.mid', '').split('_')
-                    if len(filename_parts) >= 2:
-                        try:
-                            year_from_file = int(filename_parts[0])
-                            pos_from_file = int(filename_parts[1])
-                            if 1950 <= year_from_file <= 2024:
-                                year_match = year_from_file
-                                position_match = pos_from_file
-                        except ValueError:
-                            pass
+                    filename_match = MIDI_FILENAME_RE.match(filename)
+                    if filename_match:
+                        year_from_file = int(filename_match.group(1))
+                        if 1950 <= year_from_file <= 2024:
+                            year_match = year_from_file
+                            position_match = int(filename_match.group(2))
                 
                 if year_match and position_match:
-                    cursor.execute("""
-                        SELECT id, title, artist, year, position 
-                        FROM bimmuda_songs 
-                        WHERE year = ? AND position = ?
-                    """, (year_match, position_match))
-                    result = cursor.fetchone()
+                    result = songs_by_position.get((year_match, position_match))
                     if result:
-                        conn.close()
                         return result
                         
             except Exception as e:
                 print(f"  Error parsing path {midi_path}: {e}")
         
         # Fallback: try to match source_midis files using hardcoded mappings
-        source_mappings = {
-            "All-Shook-Up-1.mid": ("All Shook Up", "Elvis Presley"),
-            "AllIHaveToDoIsDream.mid": ("All I Have to Do Is Dream", "The Everly Brothers"),
-            "California-Dreaming.mid": ("California Dreamin'", "The Mamas & The Papas"),
-            "HeyJude.mid": ("Hey Jude", "The Beatles"),
-            "I-Get-Around-1.mid": ("I Get Around", "The Beach Boys"),
-            "JoyToTheWorld.mid": ("Joy to the World", "Three Dog Night"),
-            "Paula Abdul - Straight Up L.mid": ("Straight Up", "Paula Abdul")
-        }
+        if filename in SOURCE_MIDI_SONGS:
+            return songs_by_title.get(SOURCE_MIDI_SONGS[filename])
         
-        if filename in source_mappings:
-            title, artist = source_mappings[filename]
-            cursor.execute("""
-                SELECT id, title, artist, year, position 
-                FROM bimmuda_songs 
-                WHERE title = ? AND artist = ?
-            """, (title, artist))
-            result = cursor.fetchone()
-            if result:
-                conn.close()
-                return result
-        
-        conn.close()
         return None
 
-    def process_all_midis(self, limit=None):
+    def process_all_midis(self, limit=None, verbose=False):
         """Process all MIDI files and extract chords"""
         print("Starting comprehensive MIDI chord extraction...")
         
@@ -246,12 +291,27 @@ class ChordExtractor:
         processed = 0
         matches = 0
         
+        # Files unchanged since the last run reuse their cached chords
+        chord_cache = self.load_chord_cache()
+        new_cache_entries = []
+        
         for midi_file in midi_files:
             processed += 1
-            print(f"Processing {processed}/{len(midi_files)}: {os.path.basename(midi_file)}")
+            if verbose:
+                print(f"Processing {processed}/{len(midi_files)}: {os.path.basename(midi_file)}")
+            elif processed % 50 == 0:
+                print(f"Processed {processed}/{len(midi_files)} MIDI files...")
             
             # Extract chords
-            chords = self.midi_to_chords(midi_file)
+            stat = os.stat(midi_file)
+            cached = chord_cache.get(midi_file)
+            if cached and cached[:2] == (stat.st_mtime, stat.st_size):
+                chords = cached[2]
+            else:
+                chords = self.midi_to_chords(midi_file)
+                # None also means a parse error, so only cache real results
+                if chords:
+                    new_cache_entries.append((midi_file, stat.st_mtime, stat.st_size, chords))
             
             if chords:
                 # Try to match to database song
@@ -267,12 +327,15 @@ class ChordExtractor:
                         'midi_file': midi_file
                     }
                     matches += 1
-                    print(f"  Matched: {title} by {artist} -> {chords}")
-                else:
+                    if verbose:
+                        print(f"  Matched: {title} by {artist} -> {chords}")
+                elif verbose:
                     print(f"  No database match for {os.path.basename(midi_file)}")
-            else:
+            elif verbose:
                 print(f"  No chords extracted from {os.path.basename(midi_file)}")
         
+        self.save_chord_cache(new_cache_entries)
+        
         print(f"\nCompleted! Processed {processed} MIDI files, found {matches} database matches")
         return chord_results
 
@@ -304,18 +367,23 @@ class ChordExtractor:
         """Parse a McGill .lab chord annotation file"""
         try:
             chords = []
+            seen = {'N'}  # Skip 'N' (no chord)
             with open(lab_file_path, 'r') as f:
                 for line in f:
                     line = line.strip()
                     if line:
-                        # Format: start_time end_time chord_label
-                        parts = line.split('\t')
+                        # Format: start_time end_time chord_label; anything
+                        # after a third tab is never looked at
+                        parts = line.split('\t', 3)
                         if len(parts) >= 3:
                             chord_label = parts[2].strip()
-                            if chord_label != 'N' and chord_label not in chords:  # Skip 'N' (no chord)
+                            if chord_label not in seen:
+                                seen.add(chord_label)
                                 chords.append(chord_label)
+                                if len(chords) == 8:
+                                    break  # Only the first 8 are kept
             
-            return " - ".join(chords[:8]) if chords else None
+            return " - ".join(chords) if chords else None
         except Exception as e:
             print(f"Error parsing {lab_file_path}: {e}")
             return None
@@ -330,31 +398,46 @@ class ChordExtractor:
         # Add chord_progression column if it doesn't exist
         try:
             cursor.execute("ALTER TABLE bimmuda_songs ADD COLUMN chord_progression TEXT")
-            conn.commit()
             print("Added chord_progression column to database")
         except sqlite3.OperationalError:
             # Column already exists
             pass
         
-        # Update with MIDI-extracted chords
-        midi_updates = 0
-        for song_id, song_data in midi_chord_results.items():
-            cursor.execute("""
+        # Keep any index build's sort and page writes in memory; these
+        # pragmas only affect this connection. The journal mode is left
+        # alone: the website switches the file to WAL, which is persistent
+        # and lets it keep reading while these updates are written.
+        cursor.execute("PRAGMA cache_size=-262144")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        
+        # All updates (and the index, on the first run) commit together or
+        # roll back together on error, so readers never see a half-updated table
+        with conn:
+            # Update with MIDI-extracted chords
+            cursor.executemany("""
                 UPDATE bimmuda_songs 
                 SET chord_progression = ? 
                 WHERE id = ?
-            """, (song_data['chords'], song_id))
-            midi_updates += 1
-        
-        # Update with McGill chords (for songs that don't have MIDI chords)
-        mcgill_updates = 0
-        for mcgill_id, chords in mcgill_chord_data.items():
-            # Try to match McGill ID to database songs
-            # This would need more sophisticated matching logic
-            # For now, we'll skip this step and focus on MIDI data
-            pass
+            """, ((song_data['chords'], song_id) for song_id, song_data in midi_chord_results.items()))
+            midi_updates = len(midi_chord_results)
+            
+            # Update with McGill chords (for songs that don't have MIDI chords)
+            mcgill_updates = 0
+            for mcgill_id, chords in mcgill_chord_data.items():
+                # Try to match McGill ID to database songs
+                # This would need more sophisticated matching logic
+                # For now, we'll skip this step and focus on MIDI data
+                pass
+            
+            # Index the columns the website and tab generator filter/sort on:
+            # decade pages scan by year range ordered by title
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_bimmuda_songs_year_title
+                ON bimmuda_songs(year, title)
+            """)
         
-        conn.commit()
+        # Refresh planner statistics now that the table has changed
+        cursor.execute("ANALYZE")
         conn.close()
         
         print(f"Updated database: {midi_updates} MIDI chord progressions, {mcgill_updates} McGill annotations")
@@ -367,7 +450,7 @@ def main():
     extractor = ChordExtractor()
     
     # Process all MIDI files
-    midi_results = extractor.process_all_midis()
+    midi_results = extractor.process_all_midis(verbose='--verbose' in sys.argv[1:])
     
     # Load McGill annotations
     mcgill_results = extractor.load_mcgill_annotations()
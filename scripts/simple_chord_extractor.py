@@ -4,9 +4,31 @@ Simple MIDI Chord Extractor
 Extracts guitar chords from MIDI files for the website
 """
 
+import contextlib
+import io
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pretty_midi
-from collections import Counter
+
+# Map pitch classes to note names
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+def pitch_mask(pitches):
+    """Encode a set of pitch classes as a 12-bit integer (bit n = pitch class n)"""
+    mask = 0
+    for pitch in pitches:
+        mask |= 1 << pitch
+    return mask
+
+# Common chord patterns (simplified): major and minor triads on every root,
+# keyed by pitch-class mask so lookups hash a single int
+CHORD_BY_MASK = {
+    pitch_mask([root, (root + third) % 12, (root + 7) % 12]): root_name + suffix
+    for root, root_name in enumerate(NOTE_NAMES)
+    for third, suffix in ((4, ''), (3, 'm'))
+}
 
 def midi_to_chords(midi_file_path):
     """Extract chord progression from MIDI file"""
@@ -25,29 +47,70 @@ def midi_to_chords(midi_file_path):
         # Sort notes by start time
         all_notes.sort(key=lambda x: x.start)
         
+        # Flatten notes into parallel arrays so window boundaries can be
+        # located with vectorized searches instead of per-note loops
+        starts = np.array([note.start for note in all_notes])
+        ends = np.array([note.end for note in all_notes])
+        note_pitches = [note.pitch % 12 for note in all_notes]  # Pitch class (0-11)
+        
         # Group notes into 2-second windows to find chords
         chords = []
         window_size = 2.0  # 2 seconds
-        current_time = 0
+        end_time = ends.max()
+        window_times = np.arange(0, end_time, window_size)
         
-        while current_time < max(note.end for note in all_notes):
-            # Get notes playing in this time window
-            window_notes = []
-            for note in all_notes:
-                if note.start <= current_time < note.end or (current_time <= note.start < current_time + window_size):
-                    window_notes.append(note.pitch % 12)  # Get pitch class (0-11)
+        # A window holds the notes sounding at its start plus those starting
+        # inside it. Treat that as a stream of events: a note enters once it
+        # starts before the window ends, and leaves once it has stopped
+        # sounding before the window starts (a note that does not extend past
+        # its own start leaves only once the window starts after it).
+        leave_times = np.where(ends > starts, ends, np.nextafter(starts, np.inf))
+        leave_order = np.argsort(leave_times, kind='stable')
+        window_entered = np.searchsorted(starts, window_times + window_size, side='left').tolist()
+        window_left = np.searchsorted(leave_times[leave_order], window_times, side='right').tolist()
+        leave_order = leave_order.tolist()
+        
+        # Live per-window state: note count per pitch class, and for each
+        # pitch class its notes in start order with a cursor past the ones
+        # that have left (the cursor then marks its first appearance)
+        counts = [0] * 12
+        notes_by_pitch = [[] for _ in range(12)]
+        for index, pitch in enumerate(note_pitches):
+            notes_by_pitch[pitch].append(index)
+        first_cursor = [0] * 12
+        has_left = [False] * len(all_notes)
+        entered = left = 0
+        
+        for window_end_entered, window_start_left in zip(window_entered, window_left):
+            if len(chords) >= 8:
+                break  # Only the first 8 chords are returned
+            
+            # Held notes often make consecutive windows identical; the same
+            # notes give the same chord, which has already been handled
+            if window_end_entered == entered and window_start_left == left:
+                continue
+            
+            for index in range(entered, window_end_entered):
+                counts[note_pitches[index]] += 1
+            for index in leave_order[left:window_start_left]:
+                counts[note_pitches[index]] -= 1
+                has_left[index] = True
+            entered, left = window_end_entered, window_start_left
             
-            if len(window_notes) >= 2:  # Need at least 2 notes for a chord
-                # Find most common pitch classes in this window
-                pitch_counts = Counter(window_notes)
-                chord_pitches = [pitch for pitch, count in pitch_counts.most_common(6) if count >= 1]
+            if entered - left >= 2:  # Need at least 2 notes for a chord
+                # Rank pitch classes by count, ties broken by first appearance
+                present = [pitch for pitch in range(12) if counts[pitch]]
+                for pitch in present:
+                    pitch_notes = notes_by_pitch[pitch]
+                    while has_left[pitch_notes[first_cursor[pitch]]]:
+                        first_cursor[pitch] += 1
+                present.sort(key=lambda pitch: (-counts[pitch], notes_by_pitch[pitch][first_cursor[pitch]]))
+                chord_pitches = present[:6]
                 
                 if chord_pitches:
                     chord_name = pitches_to_chord_name(chord_pitches)
                     if chord_name and chord_name not in chords:
                         chords.append(chord_name)
-            
-            current_time += window_size
         
         return " - ".join(chords[:8])  # Return up to 8 chords
         
@@ -57,49 +120,25 @@ def midi_to_chords(midi_file_path):
 
 def pitches_to_chord_name(pitches):
     """Convert MIDI pitch classes to chord name"""
-    # Map pitch classes to note names
-    note_names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-    
-    # Common chord patterns (simplified)
-    chord_patterns = {
-        frozenset([0, 4, 7]): 'C',           # C major
-        frozenset([0, 3, 7]): 'Cm',          # C minor
-        frozenset([1, 5, 8]): 'C#',          # C# major
-        frozenset([1, 4, 8]): 'C#m',         # C# minor
-        frozenset([2, 6, 9]): 'D',           # D major
-        frozenset([2, 5, 9]): 'Dm',          # D minor
-        frozenset([3, 7, 10]): 'D#',         # D# major
-        frozenset([3, 6, 10]): 'D#m',        # D# minor
-        frozenset([4, 8, 11]): 'E',          # E major
-        frozenset([4, 7, 11]): 'Em',         # E minor
-        frozenset([5, 9, 0]): 'F',           # F major
-        frozenset([5, 8, 0]): 'Fm',          # F minor
-        frozenset([6, 10, 1]): 'F#',         # F# major
-        frozenset([6, 9, 1]): 'F#m',         # F# minor
-        frozenset([7, 11, 2]): 'G',          # G major
-        frozenset([7, 10, 2]): 'Gm',         # G minor
-        frozenset([8, 0, 3]): 'G#',          # G# major
-        frozenset([8, 11, 3]): 'G#m',        # G# minor
-        frozenset([9, 1, 4]): 'A',           # A major
-        frozenset([9, 0, 4]): 'Am',          # A minor
-        frozenset([10, 2, 5]): 'A#',         # A# major
-        frozenset([10, 1, 5]): 'A#m',        # A# minor
-        frozenset([11, 3, 6]): 'B',          # B major
-        frozenset([11, 2, 6]): 'Bm',         # B minor
-    }
-    
     # Try to find the best matching chord
-    pitch_set = frozenset(pitches[:3])  # Use first 3 pitches
+    chord_name = CHORD_BY_MASK.get(pitch_mask(pitches[:3]))  # Use first 3 pitches
     
-    if pitch_set in chord_patterns:
-        return chord_patterns[pitch_set]
+    if chord_name:
+        return chord_name
     
     # If no exact match, return the root note
     if pitches:
-        return note_names[pitches[0]]
+        return NOTE_NAMES[pitches[0]]
     
     return None
 
+def midi_to_chords_logged(midi_file_path):
+    """Run midi_to_chords, returning (chords, anything it printed)"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        chords = midi_to_chords(midi_file_path)
+    return chords, output.getvalue()
+
 def process_all_midis():
     """Process all MIDI files in the source_midis folder"""
     midi_folder = "../data/bimmuda/BiMMuDa-main/source_midis"
@@ -117,21 +156,28 @@ def process_all_midis():
         "Paula Abdul - Straight Up L.mid": ("Straight Up", "Paula Abdul")
     }
     
+    midi_files = [midi_file for midi_file in os.listdir(midi_folder) if midi_file.endswith('.mid')]
+    midi_paths = [os.path.join(midi_folder, midi_file) for midi_file in midi_files]
+    
     results = []
+    log_lines = []
     
-    for midi_file in os.listdir(midi_folder):
-        if midi_file.endswith('.mid'):
-            midi_path = os.path.join(midi_folder, midi_file)
-            print(f"Processing: {midi_file}")
-            
-            chords = midi_to_chords(midi_path)
+    # Files are independent, so parse them across worker processes;
+    # map() yields in input order, so output matches a serial run
+    with ProcessPoolExecutor() as executor:
+        for midi_file, (chords, output) in zip(midi_files, executor.map(midi_to_chords_logged, midi_paths)):
+            log_lines.append(f"Processing: {midi_file}\n")
+            log_lines.append(output)  # Errors stay next to the file they belong to
             
             if chords and midi_file in midi_to_song:
                 song_title, artist = midi_to_song[midi_file]
                 results.append((song_title, artist, chords, midi_file))
-                print(f"  -> {song_title} by {artist}: {chords}")
+                log_lines.append(f"  -> {song_title} by {artist}: {chords}\n")
             else:
-                print(f"  -> Failed to extract chords from {midi_file}")
+                log_lines.append(f"  -> Failed to extract chords from {midi_file}\n")
+    
+    # Per-file log goes out in one write rather than a print per line
+    sys.stdout.write("".join(log_lines))
     
     return results
 
@@ -139,6 +185,6 @@ if __name__ == "__main__":
     results = process_all_midis()
     print(f"\nExtracted chords from {len(results)} songs!")
     
-    # Show results
-    for song_title, artist, chords, midi_file in results:
-        print(f"{song_title} by {artist}: {chords}")
\ No newline at end of file
+    # Show results (one buffered write instead of a print per song)
+    sys.stdout.write("".join(f"{song_title} by {artist}: {chords}\n"
+                             for song_title, artist, chords, midi_file in results))
\ No newline at end of file
@@ -10,6 +10,7 @@ from collections import defaultdict
 class TablatureGenerator:
     def __init__(self, db_path='../data/databases/billboard_data.db'):
         self.db_path = db_path
+        self._conn = None  # Opened on first use, see _db()
         
         # Basic chord-to-tablature patterns (simplified strumming patterns)
         self.chord_tab_patterns = {
@@ -137,27 +138,80 @@ class TablatureGenerator:
             '2/4': 2,
             '6/8': 6
         }
+        
+        # Chords we have tabs for, used for membership tests
+        self._chord_keys = frozenset(self.chord_tab_patterns)
+        
+        # Parsed progressions, see _parse_progression()
+        self._progression_cache = {}
+        
+        # Numeric difficulty per chord (Beginner 1, Intermediate 2, else 3)
+        self._difficulty_scores = {
+            chord: {'Beginner': 1, 'Intermediate': 2}.get(data['difficulty'], 3)
+            for chord, data in self.chord_tab_patterns.items()
+        }
+        
+        # One measure of the simple strumming pattern (4 strums per chord)
+        # for every chord and string, in the same order as 'frets'
+        self._strum_segments = {
+            chord: [f"{fret}-{fret}-{fret}-{fret}-|" for fret in data['frets']]
+            for chord, data in self.chord_tab_patterns.items()
+        }
+    
+    def _db(self):
+        """Get the generator's database connection, opening it on first use"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, isolation_level=None)
+            
+            # Supported chords with the same scores _assess_difficulty uses
+            self._conn.execute("CREATE TEMP TABLE supported_chord (name TEXT PRIMARY KEY, score INTEGER)")
+            self._conn.executemany("INSERT INTO supported_chord VALUES (?, ?)",
+                                   self._difficulty_scores.items())
+            
+            self._conn.create_function("has_full_tabs", 1, self._has_full_tabs, deterministic=True)
+        return self._conn
+    
+    def close(self):
+        """Close the database connection if one is open"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
+    def _parse_progression(self, chord_progression):
+        """Split a progression into (chords, available_chords) tuples, cached per string"""
+        parsed = self._progression_cache.get(chord_progression)
+        if parsed is None:
+            chords = tuple(chord.strip() for chord in chord_progression.split(' - '))
+            
+            # Filter out chords we don't have tabs for
+            available_chords = tuple(chord for chord in chords if chord in self._chord_keys)
+            
+            parsed = self._progression_cache[chord_progression] = (chords, available_chords)
+        
+        return parsed
+    
+    def _has_full_tabs(self, chord_progression):
+        """Whether a progression has at least 3 chords, all with tabs available"""
+        chords, available_chords = self._parse_progression(chord_progression)
+        return len(available_chords) >= 3 and len(available_chords) == len(chords)
     
     def generate_chord_progression_tab(self, chord_progression, key='C', time_sig='4/4', style='basic'):
         """Generate a basic tablature for a chord progression"""
         if not chord_progression:
             return None
         
-        chords = [chord.strip() for chord in chord_progression.split(' - ')]
-        
-        # Filter out chords we don't have tabs for
-        available_chords = [chord for chord in chords if chord in self.chord_tab_patterns]
+        chords, available_chords = self._parse_progression(chord_progression)
         
         if not available_chords:
             return {
                 'error': 'No tablature available for these chords',
-                'missing_chords': chords,
+                'missing_chords': list(chords),
                 'suggestion': 'Try songs with basic open chords like C, Am, F, G, D, Em, A, E'
             }
         
         # Generate tab
         tab_result = {
-            'chords': available_chords,
+            'chords': list(available_chords),
             'time_signature': time_sig,
             'strumming_pattern': self.strumming_patterns.get(style, 'D-D-U-U-D-U'),
             'difficulty': self._assess_difficulty(available_chords),
@@ -200,31 +254,21 @@ class TablatureGenerator:
             line_chords = chords[i:i + measures_per_line]
             
             # Create chord names line
-            chord_line = ""
-            for chord in line_chords:
-                chord_line += f"{chord:>8s}        "
-            tab_lines.append(chord_line)
+            tab_lines.append("".join(f"{chord:>8s}        " for chord in line_chords))
             
             # Create tab lines for each string (E to e)
             string_names = ['E', 'A', 'D', 'G', 'B', 'e']
             
             for string_idx, string_name in enumerate(string_names):
-                string_line = f"{string_name}|"
+                parts = [f"{string_name}|"]
                 
                 for chord in line_chords:
-                    if chord in self.chord_tab_patterns:
-                        fret = self.chord_tab_patterns[chord]['frets'][string_idx]
-                        # Simple strumming pattern (4 strums per chord)
-                        if fret == 'x':
-                            string_line += "x-x-x-x-|"
-                        elif fret == '0':
-                            string_line += "0-0-0-0-|"
-                        else:
-                            string_line += f"{fret}-{fret}-{fret}-{fret}-|"
+                    if chord in self._chord_keys:
+                        parts.append(self._strum_segments[chord][string_idx])
                     else:
-                        string_line += "----------|"
+                        parts.append("----------|")
                 
-                tab_lines.append(string_line)
+                tab_lines.append("".join(parts))
             
             tab_lines.append("")  # Empty line between measures
         
@@ -235,15 +279,8 @@ class TablatureGenerator:
         if not chords:
             return "Unknown"
         
-        difficulty_scores = []
-        for chord in chords:
-            if chord in self.chord_tab_patterns:
-                if self.chord_tab_patterns[chord]['difficulty'] == 'Beginner':
-                    difficulty_scores.append(1)
-                elif self.chord_tab_patterns[chord]['difficulty'] == 'Intermediate':
-                    difficulty_scores.append(2)
-                else:
-                    difficulty_scores.append(3)
+        difficulty_scores = [self._difficulty_scores[chord] for chord in chords
+                             if chord in self._difficulty_scores]
         
         if not difficulty_scores:
             return "Unknown"
@@ -259,90 +296,113 @@ class TablatureGenerator:
     
     def analyze_tab_potential(self):
         """Analyze how many songs we could generate tabs for"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._db().cursor()
         
+        # Split each progression on ' - ' (same as str.split) and count how
+        # many of its chords we have tabs for
+        cursor.execute("DROP TABLE IF EXISTS temp.song_tab_coverage")
         cursor.execute("""
-            SELECT chord_progression FROM bimmuda_songs 
-            WHERE chord_progression IS NOT NULL
+            CREATE TEMP TABLE song_tab_coverage AS
+            WITH RECURSIVE split(song_id, chord, rest) AS (
+                SELECT rowid, NULL, chord_progression 
+                FROM bimmuda_songs 
+                WHERE chord_progression IS NOT NULL
+                UNION ALL
+                SELECT song_id,
+                       CASE WHEN instr(rest, ' - ') > 0
+                            THEN substr(rest, 1, instr(rest, ' - ') - 1) ELSE rest END,
+                       CASE WHEN instr(rest, ' - ') > 0
+                            THEN substr(rest, instr(rest, ' - ') + 3) END
+                FROM split
+                WHERE rest IS NOT NULL
+            )
+            SELECT song_id,
+                   COUNT(*) AS total_chords,
+                   COUNT(supported_chord.name) AS available_chords,
+                   AVG(supported_chord.score) AS avg_score
+            FROM split
+            LEFT JOIN supported_chord
+                ON supported_chord.name = trim(split.chord, char(32, 9, 10, 11, 12, 13))
+            WHERE split.chord IS NOT NULL
+            GROUP BY song_id
         """)
         
-        progressions = cursor.fetchall()
-        conn.close()
+        # Difficulty thresholds match _assess_difficulty
+        cursor.execute("""
+            SELECT 
+                COUNT(*),
+                COALESCE(SUM(available_chords = total_chords), 0),
+                COALESCE(SUM(available_chords > 0 AND available_chords < total_chords), 0),
+                COALESCE(SUM(available_chords = 0), 0),
+                COALESCE(SUM(available_chords = total_chords AND avg_score <= 1.2), 0),
+                COALESCE(SUM(available_chords = total_chords AND avg_score > 1.2 AND avg_score <= 2.0), 0),
+                COALESCE(SUM(available_chords = total_chords AND avg_score > 2.0), 0)
+            FROM song_tab_coverage
+        """)
+        total, complete, partial, none, beginner, intermediate, advanced = cursor.fetchone()
         
         tab_stats = {
-            'total_songs': len(progressions),
-            'can_create_tabs': 0,
-            'partial_tabs': 0,
-            'no_tabs': 0,
-            'beginner_friendly': 0,
-            'intermediate': 0,
-            'advanced': 0,
+            'total_songs': total,
+            'can_create_tabs': complete,
+            'partial_tabs': partial,
+            'no_tabs': none,
+            'beginner_friendly': beginner,
+            'intermediate': intermediate,
+            'advanced': advanced,
             'common_chord_combinations': defaultdict(int)
         }
         
-        for progression_tuple in progressions:
-            progression = progression_tuple[0]
-            chords = [chord.strip() for chord in progression.split(' - ')]
-            
-            available_chords = [chord for chord in chords if chord in self.chord_tab_patterns]
-            
-            if len(available_chords) == len(chords):
-                tab_stats['can_create_tabs'] += 1
-                difficulty = self._assess_difficulty(available_chords)
-                tab_stats[difficulty.lower() + '_friendly'] += 1
-                
-                # Track common combinations
-                if len(available_chords) <= 4:  # Track only simple progressions
-                    combo = ' - '.join(sorted(available_chords))
-                    tab_stats['common_chord_combinations'][combo] += 1
-                    
-            elif available_chords:
-                tab_stats['partial_tabs'] += 1
-            else:
-                tab_stats['no_tabs'] += 1
+        # Track common combinations of simple progressions only
+        cursor.execute("""
+            SELECT chord_progression FROM bimmuda_songs 
+            WHERE rowid IN (
+                SELECT song_id FROM song_tab_coverage 
+                WHERE available_chords = total_chords AND total_chords <= 4
+            )
+        """)
+        
+        # Consume rows straight from the cursor instead of fetchall()
+        for (progression,) in cursor:
+            chords, available_chords = self._parse_progression(progression)
+            combo = ' - '.join(sorted(available_chords))
+            tab_stats['common_chord_combinations'][combo] += 1
         
         return tab_stats
     
     def generate_sample_tabs(self, limit=5):
         """Generate sample tablatures for beginner-friendly songs"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._db().cursor()
         
+        # Prioritize songs with all chords available
         cursor.execute("""
             SELECT title, artist, year, chord_progression, genre_broad_1
             FROM bimmuda_songs 
             WHERE chord_progression IS NOT NULL 
             AND genre_broad_1 IN ('Rock', 'Pop', 'Country', 'Folk')
+            AND has_full_tabs(chord_progression)
             ORDER BY year DESC
-            LIMIT ?
-        """, (limit * 3,))  # Get more than needed to filter for beginner-friendly
-        
-        songs = cursor.fetchall()
-        conn.close()
+        """)
         
         sample_tabs = []
         
-        for title, artist, year, chords, genre in songs:
-            chord_list = [chord.strip() for chord in chords.split(' - ')]
-            available_chords = [chord for chord in chord_list if chord in self.chord_tab_patterns]
+        for title, artist, year, chords, genre in cursor:
+            tab_result = self.generate_chord_progression_tab(chords, style='basic')
             
-            # Prioritize songs with all chords available and beginner-friendly
-            if len(available_chords) >= 3 and len(available_chords) == len(chord_list):
-                tab_result = self.generate_chord_progression_tab(chords, style='basic')
+            # ...that are beginner-friendly
+            if tab_result and not tab_result.get('error') and tab_result['difficulty'] in ['Beginner', 'Intermediate']:
+                sample_tabs.append({
+                    'title': title,
+                    'artist': artist,
+                    'year': year,
+                    'genre': genre,
+                    'original_chords': chords,
+                    'tab_data': tab_result
+                })
                 
-                if tab_result and not tab_result.get('error') and tab_result['difficulty'] in ['Beginner', 'Intermediate']:
-                    sample_tabs.append({
-                        'title': title,
-                        'artist': artist,
-                        'year': year,
-                        'genre': genre,
-                        'original_chords': chords,
-                        'tab_data': tab_result
-                    })
-                    
-                    if len(sample_tabs) >= limit:
-                        break
+                if len(sample_tabs) >= limit:
+                    break
+        
+        cursor.close()
         
         return sample_tabs
     
@@ -352,22 +412,25 @@ class TablatureGenerator:
             safe_title = "".join(c for c in song_title if c.isalnum() or c in (' ', '-', '_')).rstrip()
             filename = f"{safe_title}_tab.txt"
         
+        # Assemble the whole file first and write it in one call
+        lines = [
+            f"Guitar Tablature: {song_title} by {artist}",
+            "=" * 60,
+            "",
+            *tab_data.get('tab_notation', []),
+            "",
+            "",
+            "Additional Information:",
+            f"Difficulty: {tab_data.get('difficulty', 'Unknown')}",
+            f"Strumming Pattern: {tab_data.get('strumming_pattern', 'N/A')}"
+        ]
+        
+        if tab_data.get('notes'):
+            lines.extend(["", "Notes:"])
+            lines.extend(f"- {note}" for note in tab_data['notes'])
+        
         with open(filename, 'w', encoding='utf-8') as f:
-            f.write(f"Guitar Tablature: {song_title} by {artist}\n")
-            f.write("=" * 60 + "\n\n")
-            
-            if 'tab_notation' in tab_data:
-                for line in tab_data['tab_notation']:
-                    f.write(line + "\n")
-            
-            f.write("\n\nAdditional Information:\n")
-            f.write(f"Difficulty: {tab_data.get('difficulty', 'Unknown')}\n")
-            f.write(f"Strumming Pattern: {tab_data.get('strumming_pattern', 'N/A')}\n")
-            
-            if tab_data.get('notes'):
-                f.write("\nNotes:\n")
-                for note in tab_data['notes']:
-                    f.write(f"- {note}\n")
+            f.write("\n".join(lines) + "\n")
         
         return filename
 
@@ -435,6 +498,8 @@ def main():
     
     coverage_percent = (stats['can_create_tabs'] / stats['total_songs'] * 100)
     print(f"\nTab Coverage: {coverage_percent:.1f}% of songs can have complete tablatures")
+    
+    generator.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -38,6 +38,8 @@ def test_sample_songs():
         print("Warning: chord_library.json not found")
         chord_library = {}
     
+    library_chords = frozenset(chord_library)
+    
     for title, artist, chord_progression in songs:
         print(f"Song: {title} by {artist}")
         print(f"Chords: {chord_progression}")
@@ -45,11 +47,7 @@ def test_sample_songs():
         # Parse chords and check if they're in the library
         if chord_progression:
             chords = [c.strip() for c in chord_progression.split(' - ') if c.strip()]
-            missing_chords = []
-            
-            for chord in chords:
-                if chord not in chord_library:
-                    missing_chords.append(chord)
+            missing_chords = [chord for chord in chords if chord not in library_chords]
             
             if missing_chords:
                 print(f"Missing chords: {missing_chords}")
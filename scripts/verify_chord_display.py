@@ -6,7 +6,23 @@ Verify that chord diagrams are properly integrated and displaying
 import requests
 import sqlite3
 import re
-import json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+CHORD_BUTTON_RE = re.compile(r'<button[^>]*onclick="showChord\(\'([^\']+)\'\)"[^>]*>')
+CHORD_MARKERS = ('id="chord-diagram-container"', 'jTab', 'chordLibrary')
+CHORD_MARKER_RE = re.compile('|'.join(map(re.escape, CHORD_MARKERS)))
+
+# One keep-alive session shared by every page fetch
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_connections=8, pool_maxsize=8))
+
+def fetch_song_page(song_url):
+    """Fetch a song page, returning (response, error)"""
+    try:
+        return session.get(song_url, timeout=5), None
+    except Exception as e:
+        return None, e
 
 def verify_chord_integration():
     """Verify chord integration on the website"""
@@ -32,22 +48,32 @@ def verify_chord_integration():
     print("Verifying chord diagram integration...")
     print("=" * 50)
     
-    for song_id, title, artist, chord_progression in songs:
+    # Fetch all pages concurrently, then report in the original order
+    song_urls = [f"{base_url}/song/{song[0]}" for song in songs]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        pages = list(executor.map(fetch_song_page, song_urls))
+    
+    for (song_id, title, artist, chord_progression), (response, error) in zip(songs, pages):
         print(f"\nSong: {title} by {artist}")
         print(f"Chords: {chord_progression}")
         
         try:
-            song_url = f"{base_url}/song/{song_id}"
-            response = requests.get(song_url, timeout=5)
+            if error is not None:
+                raise error
             
             if response.status_code == 200:
                 html_content = response.text
                 
                 # Check for chord-related elements using regex
-                chord_buttons = re.findall(r'<button[^>]*onclick="showChord\(\'([^\']+)\'\)"[^>]*>', html_content)
-                chord_container = 'id="chord-diagram-container"' in html_content
-                jtab_script = 'jTab' in html_content
-                chord_library = 'chordLibrary' in html_content
+                chord_buttons = CHORD_BUTTON_RE.findall(html_content)
+                
+                # Find all page markers in one scan, stopping once each is seen
+                markers_found = set()
+                for match in CHORD_MARKER_RE.finditer(html_content):
+                    markers_found.add(match.group())
+                    if len(markers_found) == len(CHORD_MARKERS):
+                        break
+                chord_container, jtab_script, chord_library = (marker in markers_found for marker in CHORD_MARKERS)
                 
                 print(f"  Status: Page loaded successfully")
                 print(f"  Chord buttons found: {len(chord_buttons)}")
@@ -62,7 +88,8 @@ def verify_chord_integration():
                     print(f"  Expected chords: {chord_list}")
                     print(f"  Found chord buttons: {chord_buttons}")
                     
-                    missing = [c for c in chord_list if c not in chord_buttons]
+                    button_set = set(chord_buttons)
+                    missing = [c for c in chord_list if c not in button_set]
                     if missing:
                         print(f"  Missing chord buttons: {missing}")
                     else: